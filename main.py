@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 from PIL import Image, ImageFilter
 import os
 import base64
+import io
+from collections import namedtuple
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
 
 
 def get_image_path(folder, filename):
@@ -14,18 +22,65 @@ def get_image_path(folder, filename):
     return None
 
 
+TEAM_LOGO_FILENAMES = {
+    "LNG": "LNG_esports",
+    "WBG": "WBG_gaming",
+    "HLE": "HLE_esports",
+    "BLG": "BLG_gaming",
+    "TES": "TES_esports",
+    "T1": "T1_esports",
+    "FLY": "FLY_esports",
+    "GEN": "GENG_esports"
+}
+
+
 def get_team_logo_filename(team):
-    mapping = {
-        "LNG": "LNG_esports",
-        "WBG": "WBG_gaming",
-        "HLE": "HLE_esports",
-        "BLG": "BLG_gaming",
-        "TES": "TES_esports",
-        "T1": "T1_esports",
-        "FLY": "FLY_esports",
-        "GEN": "GENG_esports"
-    }
-    return mapping.get(team, team)
+    return TEAM_LOGO_FILENAMES.get(team, team)
+
+
+@st.cache_resource
+def load_team_logo_paths():
+    # Resolve every known team's logo once so reruns do plain dict lookups.
+    return {team: get_image_path("images/logos", filename) for team, filename in TEAM_LOGO_FILENAMES.items()}
+
+
+TEAM_LOGO_PATHS = load_team_logo_paths()
+
+
+def get_team_logo_path(team):
+    if team in TEAM_LOGO_PATHS:
+        return TEAM_LOGO_PATHS[team]
+    return get_image_path("images/logos", get_team_logo_filename(team))
+
+
+@st.cache_resource
+def build_logo_thumbnails(folder="images/logos", thumb_folder="images/thumbs", width=60):
+    # Shrink each logo once so the team stats tab serves a small PNG instead of
+    # making Streamlit resize the full-size image on every rerun.
+    thumbs = {}
+    if not os.path.isdir(folder):
+        return thumbs
+    try:
+        os.makedirs(thumb_folder, exist_ok=True)
+    except OSError:
+        return thumbs
+    for name in os.listdir(folder):
+        stem = os.path.splitext(name)[0]
+        logo_path = os.path.join(folder, name)
+        thumb_path = os.path.join(thumb_folder, f"{stem}_{width}.png")
+        if not (os.path.exists(thumb_path) and os.path.getmtime(thumb_path) > os.path.getmtime(logo_path)):
+            try:
+                img = Image.open(logo_path).convert("RGBA")
+                img.thumbnail((width, img.height))
+                img.save(thumb_path, optimize=True)
+            except OSError:
+                continue
+        thumbs[stem] = thumb_path
+    return thumbs
+
+
+# The loaded frame plus the sidebar options and the exploded bans, computed once per cache entry.
+WorldsData = namedtuple("WorldsData", ["df", "stages", "teams", "banned_long"])
 
 
 @st.cache_data
@@ -33,59 +88,208 @@ def load_data():
     file_path = "2024 Worlds Quarter - Finals.xlsx"
     if not os.path.exists(file_path):
         st.error(f"Excel file not found at {file_path}")
-        return pd.DataFrame()
+        return WorldsData(pd.DataFrame(), (), (), pd.Series(dtype=object))
+
+    cache_path = "2024_worlds.parquet"
 
     try:
-        sheets_to_load = ["Quarterfinals", "Semifinals", "Finals"]
-        xl = pd.read_excel(file_path, sheet_name=sheets_to_load)
-        stages = []
-        for stage in sheets_to_load:
-            if stage in xl:
-                temp = xl[stage].copy()
-                temp["Stage"] = stage
-                stages.append(temp)
-            else:
-                st.warning(f"Sheet '{stage}' not found in the Excel file.")
-        data = pd.concat(stages, ignore_index=True)
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) > os.path.getmtime(file_path):
+            data = pd.read_parquet(cache_path)
+        else:
+            sheets_to_load = ["Quarterfinals", "Semifinals", "Finals"]
+            try:
+                xl = pd.read_excel(file_path, sheet_name=sheets_to_load, engine="calamine")
+            except ImportError:
+                xl = pd.read_excel(file_path, sheet_name=sheets_to_load, engine="openpyxl",
+                                   engine_kwargs={"read_only": True, "data_only": True})
+            stages = []
+            for stage in sheets_to_load:
+                if stage in xl:
+                    temp = xl[stage].copy()
+                    temp["Stage"] = stage
+                    stages.append(temp)
+                else:
+                    st.warning(f"Sheet '{stage}' not found in the Excel file.")
+            data = pd.concat(stages, ignore_index=True)
+            # Numeric IGNs (e.g. 369) are read as ints; keep the column text-only.
+            if "Player IGN" in data.columns:
+                data["Player IGN"] = data["Player IGN"].astype(str)
+            # Cache the raw sheets on disk so cold starts skip the xlsx parse. The write
+            # is best-effort: any failure (no pyarrow, read-only dir, Arrow type errors)
+            # only skips the cache.
+            try:
+                data.to_parquet(cache_path, compression="zstd")
+            except Exception:
+                pass
         # Process Banned Champions column safely.
         if "Banned Champions" in data.columns:
-            data["Banned Champions"] = data["Banned Champions"].fillna("").apply(
-                lambda x: [champ.strip() for champ in x.split(",") if champ.strip()]
+            data["Banned Champions"] = (
+                data["Banned Champions"].fillna("").str.strip()
+                .str.split(r"\s*,\s*", regex=True)
+                .map(lambda champs: [champ for champ in champs if champ])
             )
+            # One row per ban, so the pick/ban tab never has to explode the list column.
+            banned_long = data["Banned Champions"].explode().dropna()
         else:
             st.warning("Column 'Banned Champions' not found in the data.")
-        return data
+            banned_long = pd.Series(dtype=object, name="Banned Champions")
+        # Narrow the integer columns so every groupby touches fewer bytes. Floats stay
+        # float64: float32 shows up as noise like 386.899994 in the rounded tables.
+        for col in ("Match No", "Kills", "Deaths", "Assists", "CS", "Gold"):
+            if col in data.columns:
+                data[col] = pd.to_numeric(data[col], downcast="integer")
+        # Low-cardinality keys: groupby and filtering then work on integer codes.
+        for col in ("Stage", "Team", "Champion", "Player IGN"):
+            if col in data.columns:
+                data[col] = data[col].astype("category")
+        stages = tuple(data["Stage"].unique())
+        teams = tuple(data["Team"].unique()) if "Team" in data.columns else ()
+        return WorldsData(data, stages, teams, banned_long)
     except Exception as e:
         st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+        return WorldsData(pd.DataFrame(), (), (), pd.Series(dtype=object))
+
+
+@st.cache_data
+def load_blurred_bg(image_path, mtime, radius=5):
+    # mtime is only part of the cache key, so an edited image is re-blurred.
+    img = Image.open(image_path).convert("RGB")
+    if cv2 is not None:
+        # OpenCV's SIMD kernels are much faster than PIL's blur on large images.
+        img = Image.fromarray(cv2.GaussianBlur(np.asarray(img), (0, 0), radius))
+    else:
+        img = img.filter(ImageFilter.GaussianBlur(radius))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+def build_bg_css(image_path):
+    if not os.path.exists(image_path):
+        return None
+    encoded = load_blurred_bg(image_path, os.path.getmtime(image_path))
+    return f"""
+        <style>
+        .stApp {{
+            background-image: url("data:image/png;base64,{encoded}");
+            background-size: cover;
+            background-attachment: fixed;
+        }}
+        </style>
+    """
 
 
 def set_bg_image(image_path):
-    if os.path.exists(image_path):
-        img = Image.open(image_path).convert("RGB")
-        img = img.filter(ImageFilter.GaussianBlur(5))
-        temp_path = "temp_blurred_bg.png"
-        img.save(temp_path)
-        with open(temp_path, "rb") as image_file:
-            encoded = base64.b64encode(image_file.read()).decode()
-        css = f"""
-            <style>
-            .stApp {{
-                background-image: url("data:image/png;base64,{encoded}");
-                background-size: cover;
-                background-attachment: fixed;
-            }}
-            </style>
-        """
-        st.markdown(css, unsafe_allow_html=True)
+    # Build the CSS once per session; later reruns only re-emit it.
+    if "bg_css" not in st.session_state:
+        st.session_state.bg_css = build_bg_css(image_path)
+    if st.session_state.bg_css:
+        st.markdown(st.session_state.bg_css, unsafe_allow_html=True)
     else:
         st.info("Background image file not found.")
 
 
+def team_view(df, team, stages):
+    # One combined mask; the stage test is skipped when every stage is selected.
+    mask = df["Team"].eq(team)
+    if set(stages) != set(df["Stage"].cat.categories):
+        mask &= df["Stage"].isin(stages)
+    return df[mask]
+
+
+# The tab aggregates below take the static output of load_data. The leading underscore
+# tells st.cache_data not to hash the frames/series, which would pickle all of df on every rerun.
+@st.cache_data
+def pick_ban_counts(_picks, _bans):
+    picks = _picks.rename("Champion").to_frame().assign(kind="Pick Count")
+    bans = _bans.rename("Champion").to_frame().assign(kind="Ban Count")
+
+    # One grouped count over picks and bans together instead of two value_counts and an outer merge.
+    counts = (
+        pd.concat([picks, bans], ignore_index=True)
+        .groupby(["Champion", "kind"]).size()
+        .unstack(fill_value=0)
+        .reindex(columns=["Pick Count", "Ban Count"], fill_value=0)
+        .reset_index()
+    )
+    counts.columns.name = None
+    counts = counts.sort_values(by="Pick Count", ascending=False)
+    return counts
+
+
+@st.cache_data
+def match_summaries(_df):
+    match_summary = _df.groupby(["Stage", "Match No"], observed=True).agg({
+        "Duration (min)": "mean",
+        "Kills": "sum",
+        "Deaths": "sum",
+        "Assists": "sum",
+        "Gold": "sum",
+        "CS": "sum"
+    }).reset_index()
+
+    match_summary["KDA"] = (
+            match_summary["Kills"].astype(str) + "/" +
+            match_summary["Deaths"].astype(str) + "/" +
+            match_summary["Assists"].astype(str)
+    )
+    match_summary["Gold/Min"] = (match_summary["Gold"] / match_summary["Duration (min)"]).round(1)
+    match_summary["CS/Min"] = (match_summary["CS"] / match_summary["Duration (min)"]).round(1)
+    match_summary["Duration (min)"] = match_summary["Duration (min)"].round(1)
+    return match_summary[["Stage", "Match No", "KDA", "Gold/Min", "CS/Min", "Duration (min)"]]
+
+
+@st.cache_data
+def win_rates(_df):
+    match_avg_gold = _df.groupby(["Stage", "Match No", "Team"], observed=True).agg({"Gold": "mean"}).reset_index()
+    is_max = match_avg_gold["Gold"] == match_avg_gold.groupby(["Stage", "Match No"], observed=True)["Gold"].transform("max")
+    # Keep the first team on a tie, as idxmax did, so each match has a single winner.
+    match_winners = match_avg_gold[is_max].drop_duplicates(["Stage", "Match No"])
+    match_winners = match_winners.rename(columns={"Team": "Winning Team"})
+
+    # Look up each row's match winner instead of merging it onto a copy of the frame.
+    winners = match_winners.set_index(["Stage", "Match No"])["Winning Team"]
+    match_keys = pd.MultiIndex.from_frame(_df[["Stage", "Match No"]])
+    won = pd.Series(_df["Team"].to_numpy() == winners.reindex(match_keys).to_numpy(), index=_df.index, name="Won")
+
+    champ_wr = won.groupby(_df["Champion"], observed=True).agg(Games="size", Wins="sum").reset_index()
+    champ_wr["Win Rate (%)"] = ((champ_wr["Wins"] / champ_wr["Games"]) * 100).round(1)
+    champ_wr = champ_wr.sort_values(by="Win Rate (%)", ascending=False)
+
+    team_wr = won.groupby(_df["Team"], observed=True).agg(Games="size", Wins="sum").reset_index()
+    team_wr["Win Rate (%)"] = ((team_wr["Wins"] / team_wr["Games"]) * 100).round(1)
+    team_wr = team_wr.sort_values(by="Win Rate (%)", ascending=False)
+    return champ_wr, team_wr
+
+
+@st.cache_data
+def team_stats_table(_df):
+    team_stats = _df.groupby("Team", observed=True).agg(
+        Kills_sum=("Kills", "sum"),
+        Kills_mean=("Kills", "mean"),
+        Deaths_sum=("Deaths", "sum"),
+        Deaths_mean=("Deaths", "mean"),
+        Assists_sum=("Assists", "sum"),
+        Assists_mean=("Assists", "mean"),
+        Gold_sum=("Gold", "sum"),
+        Gold_mean=("Gold", "mean"),
+        CS_sum=("CS", "sum"),
+        CS_mean=("CS", "mean"),
+        CSMin_mean=("CS/Min", "mean"),
+        GPM_mean=("GPM", "mean"),
+    ).reset_index()
+
+    for col in team_stats.columns:
+        if team_stats[col].dtype in ['float64', 'float32']:
+            team_stats[col] = team_stats[col].round(1)
+    return team_stats
+
+
 set_bg_image("images/bg/background_img.png")
 
 with st.spinner("Loading data..."):
-    df = load_data()
+    worlds = load_data()
+df = worlds.df
 
 if df.empty:
     st.error("Data failed to load. Please check the Excel file and its sheets.")
@@ -95,16 +299,14 @@ st.title("2024 League of Legends Worlds [Quarterfinals to Finals Statistics]")
 
 
 stage_filter = st.sidebar.multiselect("Select Stage",
-                                      options=df["Stage"].unique(),
-                                      default=list(df["Stage"].unique()))
+                                      options=worlds.stages,
+                                      default=list(worlds.stages))
 if "Team" not in df.columns:
     st.error("No 'Team' column found in the data.")
     st.stop()
-teams = df["Team"].unique()
-team_filter = st.sidebar.selectbox("Select Team", options=teams)
+team_filter = st.sidebar.selectbox("Select Team", options=worlds.teams)
 
-filtered_df = df[df["Stage"].isin(stage_filter)]
-filtered_team_df = filtered_df[filtered_df["Team"] == team_filter]
+filtered_team_df = team_view(df, team_filter, stage_filter)
 
 
 highlight_tab, tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -131,8 +333,7 @@ with highlight_tab:
 with tab1:
     st.header(f"Player Stats for {team_filter}")
 
-    logo_filename = get_team_logo_filename(team_filter)
-    logo_path = get_image_path("images/logos", logo_filename)
+    logo_path = get_team_logo_path(team_filter)
     if logo_path:
         logo = Image.open(logo_path)
         st.image(logo, width=120)
@@ -194,16 +395,8 @@ with tab2:
     if "Champion" not in df.columns:
         st.error("Column 'Champion' not found in the data.")
     else:
-        all_champs = df["Champion"].value_counts().reset_index()
-        all_champs.columns = ["Champion", "Pick Count"]
-        ban_counts = df["Banned Champions"].explode().value_counts().reset_index()
-        ban_counts.columns = ["Champion", "Ban Count"]
-
-        merged = pd.merge(all_champs, ban_counts, on="Champion", how="outer").fillna(0)
-        merged = merged.sort_values(by="Pick Count", ascending=False)
-
         fig = px.bar(
-            merged,
+            pick_ban_counts(df["Champion"], worlds.banned_long),
             x="Champion",
             y=["Pick Count", "Ban Count"],
             barmode="group",
@@ -219,25 +412,7 @@ with tab3:
     if not all(col in df.columns for col in necessary_cols):
         st.error("One or more required columns for match summaries are missing in the data.")
     else:
-        match_summary = df.groupby(["Stage", "Match No"]).agg({
-            "Duration (min)": "mean",
-            "Kills": "sum",
-            "Deaths": "sum",
-            "Assists": "sum",
-            "Gold": "sum",
-            "CS": "sum"
-        }).reset_index()
-
-        match_summary["KDA"] = (
-                match_summary["Kills"].astype(str) + "/" +
-                match_summary["Deaths"].astype(str) + "/" +
-                match_summary["Assists"].astype(str)
-        )
-        match_summary["Gold/Min"] = (match_summary["Gold"] / match_summary["Duration (min)"]).round(1)
-        match_summary["CS/Min"] = (match_summary["CS"] / match_summary["Duration (min)"]).round(1)
-        match_summary["Duration (min)"] = match_summary["Duration (min)"].round(1)
-
-        st.dataframe(match_summary[["Stage", "Match No", "KDA", "Gold/Min", "CS/Min", "Duration (min)"]])
+        st.dataframe(match_summaries(df))
 
 
 with tab4:
@@ -246,29 +421,10 @@ with tab4:
     if not all(col in df.columns for col in ["Team", "Gold", "Champion"]):
         st.error("One or more required columns for win rate calculations are missing.")
     else:
-        match_avg_gold = df.groupby(["Stage", "Match No", "Team"]).agg({"Gold": "mean"}).reset_index()
-        match_winners = match_avg_gold.loc[match_avg_gold.groupby(["Stage", "Match No"])["Gold"].idxmax()]
-        match_winners = match_winners.rename(columns={"Team": "Winning Team"})
-
-        df_with_win = pd.merge(df, match_winners[["Stage", "Match No", "Winning Team"]], on=["Stage", "Match No"],
-                               how="left")
-        df_with_win["Won"] = df_with_win["Team"] == df_with_win["Winning Team"]
-
-        champ_wins = df_with_win[df_with_win["Won"]].groupby("Champion").size().reset_index(name="Wins")
-        champ_total = df_with_win.groupby("Champion").size().reset_index(name="Games")
-        champ_wr = pd.merge(champ_total, champ_wins, on="Champion", how="left").fillna(0)
-        champ_wr["Win Rate (%)"] = ((champ_wr["Wins"] / champ_wr["Games"]) * 100).round(1)
-        champ_wr = champ_wr.sort_values(by="Win Rate (%)", ascending=False)
-
+        champ_wr, team_wr = win_rates(df)
         st.subheader("Champion Win Rates")
         st.dataframe(champ_wr[["Champion", "Games", "Wins", "Win Rate (%)"]])
 
-        team_wins = df_with_win[df_with_win["Won"]].groupby("Team").size().reset_index(name="Wins")
-        team_total = df_with_win.groupby("Team").size().reset_index(name="Games")
-        team_wr = pd.merge(team_total, team_wins, on="Team", how="left").fillna(0)
-        team_wr["Win Rate (%)"] = ((team_wr["Wins"] / team_wr["Games"]) * 100).round(1)
-        team_wr = team_wr.sort_values(by="Win Rate (%)", ascending=False)
-
         st.subheader("Team Win Rates")
         st.dataframe(team_wr[["Team", "Games", "Wins", "Win Rate (%)"]])
 
@@ -280,40 +436,25 @@ with tab5:
     if not all(col in df.columns for col in stats_cols):
         st.error("One or more required columns for team statistics are missing.")
     else:
-        team_stats = df.groupby("Team").agg({
-            "Kills": ["sum", "mean"],
-            "Deaths": ["sum", "mean"],
-            "Assists": ["sum", "mean"],
-            "Gold": ["sum", "mean"],
-            "CS": ["sum", "mean"],
-            "CS/Min": "mean",
-            "GPM": "mean"
-        })
-
-        team_stats.columns = ['_'.join(col).strip() for col in team_stats.columns.values]
-        team_stats = team_stats.reset_index()
-
-        for col in team_stats.columns:
-            if team_stats[col].dtype in ['float64', 'float32']:
-                team_stats[col] = team_stats[col].round(1)
-
+        team_stats = team_stats_table(df)
+        logo_thumbs = build_logo_thumbnails()
         st.subheader("Team Statistics with Logos")
-        for index, row in team_stats.iterrows():
+        for row in team_stats.itertuples(index=False):
             cols = st.columns([1, 4])
-            team_logo_filename = get_team_logo_filename(row["Team"])
-            team_logo = get_image_path("images/logos", team_logo_filename)
+            team_logo_filename = get_team_logo_filename(row.Team)
+            team_logo = logo_thumbs.get(team_logo_filename)
             if team_logo:
                 cols[0].image(team_logo, width=60)
             else:
                 cols[0].warning("No logo")
-            stats_md = (
-                f"**Team:** {row['Team']}  |  "
-                f"**Kills:** {row['Kills_sum']} (avg: {row['Kills_mean']})  |  "
-                f"**Deaths:** {row['Deaths_sum']} (avg: {row['Deaths_mean']})  |  "
-                f"**Assists:** {row['Assists_sum']} (avg: {row['Assists_mean']})  |  "
-                f"**Gold:** {row['Gold_sum']} (avg: {row['Gold_mean']})  |  "
-                f"**CS:** {row['CS_sum']} (avg: {row['CS_mean']})  |  "
-                f"**CS/Min:** {row['CS/Min_mean']:.1f}  |  "
-                f"**GPM:** {row['GPM_mean']:.1f}"
-            )
+            stats_md = "  |  ".join([
+                f"**Team:** {row.Team}",
+                f"**Kills:** {row.Kills_sum} (avg: {row.Kills_mean})",
+                f"**Deaths:** {row.Deaths_sum} (avg: {row.Deaths_mean})",
+                f"**Assists:** {row.Assists_sum} (avg: {row.Assists_mean})",
+                f"**Gold:** {row.Gold_sum} (avg: {row.Gold_mean})",
+                f"**CS:** {row.CS_sum} (avg: {row.CS_mean})",
+                f"**CS/Min:** {row.CSMin_mean:.1f}",
+                f"**GPM:** {row.GPM_mean:.1f}",
+            ])
             cols[1].markdown(stats_md)